@@ -1,5 +1,5 @@
-import sounddevice as sd
-import queue
+import rtmixer
+import numpy as np
 import threading
 import time
 import sys
@@ -17,33 +17,49 @@ VRED_TOKEN = None
 
 SAMPLE_RATE = 16000
 CHANNELS = 1
-DTYPE = 'int16'
+DTYPE = 'int16'  # PCM format sent to Riva
 CHUNK_DURATION_SEC = 0.1  # 100 ms ≈ 3200 bytes at 16kHz mono 16-bit
+RING_FRAMES = 65536  # ~4 s at 16kHz; rtmixer needs a power of two
 
-# Queue holds raw PCM byte chunks from mic -> ASR streaming
-audio_queue = queue.Queue(maxsize=50)
+# rtmixer's C callback records float32 frames straight into this lock-free
+# ring buffer; the ASR worker drains it and converts to 16-bit PCM.
+RING_ELEMENT_SIZE = CHANNELS * np.dtype(np.float32).itemsize
+audio_ring = rtmixer.RingBuffer(RING_ELEMENT_SIZE, RING_FRAMES)
 shutdown_event = threading.Event()
+# Set by main() when a full ring ended the recording; the consumer drains and clears it
+ring_overflow = threading.Event()
 
+# Preallocated slabs reused for every read; the ASR stream copies each chunk
+# into its own buffer before pulling the next one, so reuse is safe.
+_float_slab = np.zeros(RING_FRAMES * CHANNELS, dtype=np.float32)
+_pcm_slab = np.zeros(RING_FRAMES * CHANNELS, dtype=DTYPE)
 
-def audio_callback(indata, frames, time_info, status):
-    """Realtime callback from sounddevice; push raw PCM bytes to queue."""
-    if status:
-        print(f"[audio] {status}", file=sys.stderr)
-    try:
-        audio_queue.put_nowait(bytes(indata))
-    except queue.Full:
-        print("[audio] Warning: audio queue full; dropping chunk", file=sys.stderr)
+
+def _read_pcm16(frames: int) -> memoryview:
+    """Drain frames from the ring buffer into the slabs as 16-bit PCM (LE)."""
+    frames = audio_ring.readinto(_float_slab[:frames * CHANNELS])
+    samples = _float_slab[:frames * CHANNELS]
+    np.clip(samples, -1.0, 1.0, out=samples)
+    np.multiply(samples, 32767, out=samples)
+    pcm = _pcm_slab[:frames * CHANNELS]
+    pcm[:] = samples  # in-place float32 -> int16 cast, no new array
+    return memoryview(pcm).cast("B")
 
 
 def chunk_generator():
-    """Yield dicts of {'audio_content': bytes} for ASR streaming."""
+    """Yield dicts of {'audio_content': memoryview} for ASR streaming."""
+    min_frames = int(SAMPLE_RATE * CHUNK_DURATION_SEC)
     while not shutdown_event.is_set():
-        try:
-            chunk = audio_queue.get(timeout=0.5)
-            if chunk:
-                yield {"audio_content": chunk}
-        except queue.Empty:
+        if ring_overflow.is_set():
+            # Drop the stale backlog so capture can restart on an empty ring
+            audio_ring.advance_read_index(audio_ring.read_available)
+            ring_overflow.clear()
+            continue
+        available = audio_ring.read_available
+        if available < min_frames:
+            time.sleep(CHUNK_DURATION_SEC / 4)
             continue
+        yield {"audio_content": _read_pcm16(available)}
 
 
 def process_audio_stream():
@@ -55,10 +71,8 @@ def process_audio_stream():
             sample_rate_hz=SAMPLE_RATE,
             language_code="en-US",
             append_silence_tail_sec=0.0,  # live mic: no synthetic tail
+            interim_results=False,  # only finals are routed to NLU
         ):
-            if not transcript.get("is_final", False):
-                continue
-
             text = transcript.get("text", "").strip()
             if not text:
                 continue
@@ -106,15 +120,22 @@ def main():
 
     blocksize = int(SAMPLE_RATE * CHUNK_DURATION_SEC)
     try:
-        with sd.RawInputStream(
+        with rtmixer.Recorder(
             samplerate=SAMPLE_RATE,
             blocksize=blocksize,
-            dtype=DTYPE,
             channels=CHANNELS,
-            callback=audio_callback,
-        ):
+        ) as recorder:
+            action = recorder.record_ringbuffer(audio_ring)
             while not shutdown_event.is_set():
+                if action not in recorder.actions:
+                    # rtmixer ends the action when the ring fills up (ASR consumer stalled)
+                    print("[audio] Warning: audio ring full; dropping buffered audio", file=sys.stderr)
+                    ring_overflow.set()
+                    while ring_overflow.is_set() and not shutdown_event.is_set():
+                        time.sleep(0.05)
+                    action = recorder.record_ringbuffer(audio_ring)
                 time.sleep(0.2)
+            recorder.cancel(action)
     except Exception as ex:
         print(f"[main] Audio device error: {ex}", file=sys.stderr)
     finally:
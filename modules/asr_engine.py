@@ -3,7 +3,25 @@ from riva.client.proto import riva_asr_pb2, riva_asr_pb2_grpc
 
 RIVA_SERVER = "localhost:50051"
 
-channel = grpc.insecure_channel(RIVA_SERVER)
+# Send audio once at least this much has accumulated: 200 ms of 16kHz mono
+# 16-bit PCM, i.e. two 100 ms mic chunks per request (half the HTTP/2 frames
+# and protobuf messages, well under the 16 KiB gRPC buffer tier). On the live
+# mic this holds back the first chunk of each pair by one chunk period.
+STREAM_COALESCE_BYTES = 6400
+
+# One second of 16-bit PCM zeros at 16kHz; silence tails are sliced from it
+_SILENCE_1S = b"\x00" * (16000 * 2)
+
+# Channel tuning: allow large ASR responses, keep a per-channel subchannel pool,
+# and bias gRPC core toward throughput over per-call latency. The send size is
+# left at gRPC's default (unlimited) so long batch transcribe() calls still fit.
+CHANNEL_OPTIONS = [
+    ("grpc.max_receive_message_length", 16 * 1024 * 1024),
+    ("grpc.use_local_subchannel_pool", 1),
+    ("grpc.optimization_target", "throughput"),
+]
+
+channel = grpc.insecure_channel(RIVA_SERVER, options=CHANNEL_OPTIONS)
 asr_stub = riva_asr_pb2_grpc.RivaSpeechRecognitionStub(channel)
 
 def _wait_for_channel_ready(timeout_sec=5):
@@ -48,10 +66,15 @@ def _resolve_encoding_value():
     # Last resort: typical numeric value for LINEAR_PCM
     return 1
 
-def _config(sample_rate_hz: int, language_code: str):
-    encoding_value = _resolve_encoding_value()
+# Generated offline by tools/gen_riva_constants.py; resolve at import if missing
+try:
+    from .riva_constants import LINEAR_PCM as _LINEAR_PCM
+except ImportError:
+    _LINEAR_PCM = _resolve_encoding_value()
+
+def _build_config(sample_rate_hz: int, language_code: str):
     return riva_asr_pb2.RecognitionConfig(
-        encoding=encoding_value,               # your protos use 'encoding'
+        encoding=_LINEAR_PCM,                  # your protos use 'encoding'
         sample_rate_hertz=sample_rate_hz,
         language_code=language_code,
         audio_channel_count=1,
@@ -59,6 +82,14 @@ def _config(sample_rate_hz: int, language_code: str):
         enable_automatic_punctuation=True,
     )
 
+# Prebuilt config for the common case; callers copy it into their request
+_DEFAULT_CFG = _build_config(16000, "en-US")
+
+def _config(sample_rate_hz: int, language_code: str):
+    if sample_rate_hz == 16000 and language_code == "en-US":
+        return _DEFAULT_CFG
+    return _build_config(sample_rate_hz, language_code)
+
 def transcribe(audio_buffer: bytes, sample_rate_hz: int = 16000, language_code: str = "en-US") -> str:
     """
     Batch transcription: audio_buffer must be RAW 16-bit PCM (LE), mono, at sample_rate_hz.
@@ -83,11 +114,12 @@ def transcribe(audio_buffer: bytes, sample_rate_hz: int = 16000, language_code:
         print(f"Riva ASR error: code={e.code()}, details={e.details()}")
         return ""
 
-def stream_transcribe(chunk_generator, sample_rate_hz: int = 16000, language_code: str = "en-US", append_silence_tail_sec: float = 0.5):
+def stream_transcribe(chunk_generator, sample_rate_hz: int = 16000, language_code: str = "en-US", append_silence_tail_sec: float = 0.5, interim_results: bool = False):
     """
     Streaming transcription. chunk_generator yields dicts: {"audio_content": bytes}.
     Sends streaming config first, then audio chunks. Optionally appends a silence tail.
-    Yields dicts: {"text": str, "is_final": bool}.
+    Yields dicts: {"text": str, "is_final": bool}. Partial hypotheses are only
+    sent by Riva when interim_results=True (e.g. for UIs that display them).
     """
     if not _wait_for_channel_ready():
         print(f"Could not connect to Riva server at {RIVA_SERVER} within timeout.")
@@ -100,19 +132,29 @@ def stream_transcribe(chunk_generator, sample_rate_hz: int = 16000, language_cod
         yield riva_asr_pb2.StreamingRecognizeRequest(
             streaming_config=riva_asr_pb2.StreamingRecognitionConfig(
                 config=cfg,
-                interim_results=True,
+                interim_results=interim_results,
             )
         )
-        # Audio chunks
+        # Audio chunks, coalesced until STREAM_COALESCE_BYTES is reached
+        buf = bytearray()
         for item in chunk_generator:
             audio_bytes = item.get("audio_content", b"")
-            if audio_bytes:
-                yield riva_asr_pb2.StreamingRecognizeRequest(audio_content=audio_bytes)
+            if not audio_bytes:
+                continue
+            buf += audio_bytes
+            if len(buf) >= STREAM_COALESCE_BYTES:
+                yield riva_asr_pb2.StreamingRecognizeRequest(audio_content=bytes(buf))
+                buf.clear()
+        # Flush whatever is left when the generator is exhausted
+        if buf:
+            yield riva_asr_pb2.StreamingRecognizeRequest(audio_content=bytes(buf))
         # Optional: silence tail to help endpointing finalize
         if append_silence_tail_sec and append_silence_tail_sec > 0:
-            tail_samples = int(append_silence_tail_sec * sample_rate_hz)
-            tail_silence = b"\x00\x00" * tail_samples  # 16-bit PCM LE zeros
-            yield riva_asr_pb2.StreamingRecognizeRequest(audio_content=tail_silence)
+            tail_bytes = int(append_silence_tail_sec * sample_rate_hz) * 2  # 16-bit PCM LE zeros
+            while tail_bytes > 0:
+                n = min(tail_bytes, len(_SILENCE_1S))
+                yield riva_asr_pb2.StreamingRecognizeRequest(audio_content=_SILENCE_1S[:n])
+                tail_bytes -= n
 
     try:
         responses = asr_stub.StreamingRecognize(request_stream())
@@ -123,5 +165,7 @@ def stream_transcribe(chunk_generator, sample_rate_hz: int = 16000, language_cod
                         "text": result.alternatives[0].transcript,
                         "is_final": result.is_final,
                     }
+            # Drop our reference so the response can be freed before the next read
+            del response
     except grpc.RpcError as e:
         print(f"Riva streaming error: code={e.code()}, details={e.details()}")
\ No newline at end of file
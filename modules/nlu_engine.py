@@ -1,64 +1,179 @@
-from transformers import pipeline
 from sentence_transformers import SentenceTransformer
+from sklearn.linear_model import LogisticRegression
+import ahocorasick
 import faiss
 import numpy as np
 import json
-import torch
-
-# -----------------------------
-# Load Intent Classifier
-# -----------------------------
-device = 0 if torch.cuda.is_available() else -1
-intent_classifier = pipeline(
-    "text-classification",
-    model="distilbert-base-uncased",
-    device=device
-)
+import os
+import hashlib
+import re
+from functools import lru_cache
 
 # -----------------------------
 # Load Sentence Transformer
 # -----------------------------
-semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
+SEMANTIC_MODEL = 'all-MiniLM-L6-v2'
+semantic_model = SentenceTransformer(SEMANTIC_MODEL)
 
 # -----------------------------
 # Load Command Map
 # -----------------------------
-with open("commands/command_map.json", "r") as f:
-    COMMAND_MAP = json.load(f)
+COMMAND_MAP_FILE = "commands/command_map.json"
+with open(COMMAND_MAP_FILE, "rb") as f:
+    command_map_bytes = f.read()
+COMMAND_MAP = json.loads(command_map_bytes)
 
 phrases = list(COMMAND_MAP.keys())
 
-# Precompute embeddings for FAISS
-phrase_embeddings = semantic_model.encode(phrases, convert_to_numpy=True)
+# Intent classes are the distinct VSet targets; synonyms share a class and the
+# first phrase for each target stands in for it when reporting a match.
+intent_phrases = []
+_intent_class_of = {}
+for p in phrases:
+    target = tuple(COMMAND_MAP[p])
+    if target not in _intent_class_of:
+        _intent_class_of[target] = len(intent_phrases)
+        intent_phrases.append(p)
+phrase_intents = np.array([_intent_class_of[tuple(COMMAND_MAP[p])] for p in phrases])
+
+# -----------------------------
+# FAISS index + intent head (cached on disk, keyed by command map + model + format)
+# -----------------------------
+# Bump whenever _build_index changes what it writes (HNSW params, intent head, ...)
+CACHE_FORMAT_VERSION = 2
+CACHE_DIR = "cache"
+INDEX_CACHE_FILE = os.path.join(CACHE_DIR, "commands.faiss")
+EMBEDDINGS_CACHE_FILE = os.path.join(CACHE_DIR, "phrase_embeddings.npy")
+INTENT_HEAD_CACHE_FILE = os.path.join(CACHE_DIR, "intent_head.npz")
+HASH_CACHE_FILE = os.path.join(CACHE_DIR, "commands.sha256")
+
+cache_key = f"v{CACHE_FORMAT_VERSION}:{SEMANTIC_MODEL}:".encode("utf-8") + command_map_bytes
+command_map_hash = hashlib.sha256(cache_key).hexdigest()
+
+def _cache_is_fresh():
+    cache_files = (INDEX_CACHE_FILE, EMBEDDINGS_CACHE_FILE, INTENT_HEAD_CACHE_FILE)
+    if not all(os.path.exists(path) for path in cache_files):
+        return False
+    try:
+        with open(HASH_CACHE_FILE, "r") as f:
+            return f.read().strip() == command_map_hash
+    except OSError:
+        return False
+
+def _build_index():
+    """Encode all phrases, build the HNSW index and intent head, then persist them."""
+    # Normalized by the encoder so inner product equals cosine similarity
+    embeddings = semantic_model.encode(phrases, convert_to_numpy=True, normalize_embeddings=True)
+    # HNSW graph; inner product for cosine similarity
+    idx = faiss.IndexHNSWFlat(embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    idx.hnsw.efConstruction = 64
+    idx.add(embeddings)
+
+    # Linear intent head over the same embeddings: one class per VSet target
+    clf = LogisticRegression(C=100.0, max_iter=1000)
+    clf.fit(embeddings, phrase_intents)
+    weights, bias = clf.coef_.astype(np.float32), clf.intercept_.astype(np.float32)
+
+    # Invalidate first, write each file to a temp path and swap it in, and
+    # record the hash last, so an interrupted rebuild is never loaded as fresh
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if os.path.exists(HASH_CACHE_FILE):
+        os.remove(HASH_CACHE_FILE)
+    faiss.write_index(idx, INDEX_CACHE_FILE + ".tmp")
+    os.replace(INDEX_CACHE_FILE + ".tmp", INDEX_CACHE_FILE)
+    with open(EMBEDDINGS_CACHE_FILE + ".tmp", "wb") as f:
+        np.save(f, embeddings)
+    os.replace(EMBEDDINGS_CACHE_FILE + ".tmp", EMBEDDINGS_CACHE_FILE)
+    with open(INTENT_HEAD_CACHE_FILE + ".tmp", "wb") as f:
+        np.savez(f, weights=weights, bias=bias)
+    os.replace(INTENT_HEAD_CACHE_FILE + ".tmp", INTENT_HEAD_CACHE_FILE)
+    with open(HASH_CACHE_FILE + ".tmp", "w") as f:
+        f.write(command_map_hash)
+    os.replace(HASH_CACHE_FILE + ".tmp", HASH_CACHE_FILE)
+    return idx, embeddings, weights, bias
+
+if _cache_is_fresh():
+    index = faiss.read_index(INDEX_CACHE_FILE)
+    phrase_embeddings = np.load(EMBEDDINGS_CACHE_FILE, mmap_mode="r")
+    with np.load(INTENT_HEAD_CACHE_FILE) as head:
+        intent_weights, intent_bias = head["weights"], head["bias"]
+else:
+    index, phrase_embeddings, intent_weights, intent_bias = _build_index()
+index.hnsw.efSearch = 16
 dimension = phrase_embeddings.shape[1]
 
-# Build FAISS index
-index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
-# Normalize embeddings for cosine similarity
-faiss.normalize_L2(phrase_embeddings)
-index.add(phrase_embeddings)
+# -----------------------------
+# Exact / substring matchers (checked before any model runs)
+# -----------------------------
+_NON_WORD = re.compile(r"[^a-z0-9']+")
+
+def _normalize(text):
+    """Lowercase and drop punctuation (Riva adds it) so 'Raise the car.' matches."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+_PHRASE_SET = {_normalize(p): p for p in phrases}
+
+# Aho-Corasick automaton over space-padded phrases, so matches land on word boundaries
+_phrase_automaton = ahocorasick.Automaton()
+for normalized, phrase in _PHRASE_SET.items():
+    _phrase_automaton.add_word(f" {normalized} ", (len(normalized), phrase))
+_phrase_automaton.make_automaton()
+
+def phrase_match(text):
+    """Return the command phrase said verbatim (or the longest one contained) in text."""
+    normalized = _normalize(text)
+    phrase = _PHRASE_SET.get(normalized)
+    if phrase:
+        return phrase
+    best = None
+    for _, (length, phrase) in _phrase_automaton.iter(f" {normalized} "):
+        if best is None or length > best[0]:
+            best = (length, phrase)
+    return best[1] if best else None
 
 # -----------------------------
 # Functions
 # -----------------------------
+SEMANTIC_MATCH_FLOOR = 0.65  # min cosine similarity for any model-based match
+
+@lru_cache(maxsize=512)
+def _embed(text: str) -> np.ndarray:
+    """Normalized query embedding; cached since spoken commands repeat a lot."""
+    return semantic_model.encode([text], convert_to_numpy=True, normalize_embeddings=True)
+
 def classify_intent(text):
-    result = intent_classifier(text)[0]
-    return result['label'], result['score']
+    # Shares the cached MiniLM embedding with semantic_match: one forward pass
+    logits = intent_weights @ _embed(text.lower().strip())[0] + intent_bias
+    probs = np.exp(logits - logits.max())
+    probs /= probs.sum()
+    best = int(probs.argmax())
+    return intent_phrases[best], float(probs[best])
+
+def target_similarity(text, phrase):
+    """Best cosine similarity between text and any command phrase sharing phrase's target."""
+    members = phrase_intents == _intent_class_of[tuple(COMMAND_MAP[phrase])]
+    return float((phrase_embeddings[members] @ _embed(text.lower().strip())[0]).max())
 
 def semantic_match(text, top_k=1):
-    text_embedding = semantic_model.encode([text], convert_to_numpy=True)
-    faiss.normalize_L2(text_embedding)
+    text_embedding = _embed(text.lower().strip())
     scores, indices = index.search(text_embedding, top_k)
     best_score = float(scores[0][0])
     best_phrase = phrases[indices[0][0]]
-    if best_score >= 0.65:
+    if best_score >= SEMANTIC_MATCH_FLOOR:
         return best_phrase, best_score
     return None, None
 
 def get_command(text):
-    # First try intent classification
+    # Exact or contained phrase: no model needed
+    match = phrase_match(text)
+    if match:
+        return COMMAND_MAP[match], match, 1.0
+
+    # Then try intent classification. The head is a closed-set softmax and can't
+    # reject off-topic speech, so its label must also be close to that target.
     label, score = classify_intent(text)
-    if score >= 0.75 and label in COMMAND_MAP:
+    if (score >= 0.75 and label in COMMAND_MAP
+            and target_similarity(text, label) >= SEMANTIC_MATCH_FLOOR):
         return COMMAND_MAP[label], label, score
 
     # Fallback to FAISS semantic similarity
@@ -0,0 +1,3 @@
+"""Generated by tools/gen_riva_constants.py from the Riva client protos. Do not edit."""
+
+LINEAR_PCM = 1
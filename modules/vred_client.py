@@ -1,5 +1,137 @@
-import json
 import socket
+import struct
+import threading
+import time
+
+# orjson (Rust) when available; stdlib json otherwise
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
+
+HEARTBEAT_IDLE_SEC = 30.0  # ping before reuse if the socket sat idle this long
+
+# Wire framing (both directions): 4-byte big-endian length, then a JSON payload
+_FRAME_HEADER = struct.Struct(">I")
+
+
+class _StaleConnection(ConnectionError):
+    """The listener dropped the socket before it could have seen or acted on our message."""
+
+
+class VREDClient:
+    """
+    Persistent connection to the VRED listener. One length-prefixed JSON frame
+    out, one framed ACK back; reconnects transparently if the socket has gone away.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 1.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock = None
+        self._rfile = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._rfile = self._sock.makefile("rb")
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        for obj in (self._rfile, self._sock):
+            if obj is not None:
+                try:
+                    obj.close()
+                except OSError:
+                    pass
+        self._sock = None
+        self._rfile = None
+
+    def _roundtrip(self, msg: dict) -> dict:
+        self._sock.settimeout(self.timeout)
+        payload = _dumps(msg)
+        try:
+            self._sock.sendall(_FRAME_HEADER.pack(len(payload)) + payload)
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise _StaleConnection("VRED listener closed the connection") from e
+        header = self._rfile.read(_FRAME_HEADER.size)
+        if not header:
+            raise _StaleConnection("VRED listener closed the connection")
+        if len(header) < _FRAME_HEADER.size:
+            raise ConnectionError("VRED listener closed the connection")
+        (size,) = _FRAME_HEADER.unpack(header)
+        ack = self._rfile.read(size)
+        if len(ack) < size:
+            raise ConnectionError("VRED listener closed the connection")
+        self._last_used = time.monotonic()
+        try:
+            return _loads(ack)
+        except Exception:
+            return {"ok": False, "error": "invalid_ack"}
+
+    def _ensure_connected(self, token: str = None):
+        if self._sock is not None and time.monotonic() - self._last_used > HEARTBEAT_IDLE_SEC:
+            ping = {"action": "ping"}
+            if token:
+                ping["token"] = token
+            try:
+                self._roundtrip(ping)
+            except _StaleConnection:
+                self._close()
+        if self._sock is None:
+            self._connect()
+
+    def request(self, msg: dict) -> dict:
+        """
+        Send one message and return the parsed ACK. Reconnects and resends once
+        only if the socket was already dead (send failed, or EOF before any ACK
+        byte); timeouts propagate since the activation may have been applied.
+        """
+        with self._lock:
+            try:
+                self._ensure_connected(msg.get("token"))
+                return self._roundtrip(msg)
+            except _StaleConnection:
+                self._close()
+            except OSError:
+                self._close()
+                raise
+            try:
+                self._connect()
+                return self._roundtrip(msg)
+            except OSError:
+                self._close()
+                raise
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(host: str, port: int, timeout: float) -> VREDClient:
+    with _clients_lock:
+        client = _clients.get((host, port))
+        if client is None:
+            client = _clients[(host, port)] = VREDClient(host, port, timeout)
+        client.timeout = timeout
+        return client
+
 
 def send_activate_vset(host: str, port: int, group: str, name: str, token: str = None, timeout: float = 1.0):
     msg = {
@@ -10,15 +142,4 @@ def send_activate_vset(host: str, port: int, group: str, name: str, token: str =
     if token:
         msg["token"] = token
 
-    data = (json.dumps(msg) + "\n").encode("utf-8")
-    with socket.create_connection((host, port), timeout=timeout) as s:
-        s.sendall(data)
-        s.shutdown(socket.SHUT_WR)
-        s.settimeout(timeout)
-        ack = s.recv(4096)
-
-    try:
-        resp = json.loads(ack.decode("utf-8").strip())
-    except Exception:
-        resp = {"ok": False, "error": "invalid_ack"}
-    return resp
\ No newline at end of file
+    return _get_client(host, port, timeout).request(msg)
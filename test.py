@@ -1,6 +1,8 @@
 import sounddevice as sd
 import wave
 import time
+import mmap
+import struct
 from modules.asr_engine import transcribe, stream_transcribe
 
 # Settings
@@ -28,12 +30,24 @@ with wave.open(OUTPUT_FILE, 'wb') as wf:
 
 print(f"Audio saved as {OUTPUT_FILE}\n")
 
+def find_data_chunk(buf):
+    """Return (offset, size) of the PCM 'data' chunk in a RIFF/WAVE buffer."""
+    pos = 12  # skip 'RIFF' <size> 'WAVE'
+    while pos + 8 <= len(buf):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", buf, pos)
+        if chunk_id == b"data":
+            return pos + 8, min(chunk_size, len(buf) - pos - 8)
+        pos += 8 + chunk_size + (chunk_size & 1)  # chunks are word-aligned
+    raise ValueError("no data chunk in WAV file")
+
 # --- Step 2: Single-Shot Transcription ---
 print("=== Testing Single-Shot Transcription ===")
 with wave.open(OUTPUT_FILE, "rb") as wf:
     assert wf.getframerate() == SAMPLE_RATE
     assert wf.getnchannels() == CHANNELS
-    audio_bytes = wf.readframes(wf.getnframes())  # RAW PCM frames
+with open(OUTPUT_FILE, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+    data_off, data_len = find_data_chunk(mm)
+    audio_bytes = mm[data_off:data_off + data_len]  # RAW PCM frames
 text = transcribe(audio_bytes, sample_rate_hz=SAMPLE_RATE, language_code="en-US")
 print(f"Single-Shot Result: {text}\n")
 
@@ -46,15 +60,18 @@ def chunk_generator():
             fr = wf.getframerate()
             ch = wf.getnchannels()
             sw = wf.getsampwidth()
-            if fr != SAMPLE_RATE or ch != CHANNELS or sw != 2:
-                print(f"[gen] WAV format mismatch: fr={fr}, ch={ch}, sw={sw}")
-                return
-            frames_per_chunk = int(0.1 * SAMPLE_RATE)  # ~100ms (~3200 bytes)
-            while True:
-                data = wf.readframes(frames_per_chunk)
-                if not data:
-                    break
-                yield {"audio_content": data}
+        if fr != SAMPLE_RATE or ch != CHANNELS or sw != 2:
+            print(f"[gen] WAV format mismatch: fr={fr}, ch={ch}, sw={sw}")
+            return
+        chunk_bytes = int(0.1 * SAMPLE_RATE) * sw * ch  # ~100ms (~3200 bytes)
+        with open(OUTPUT_FILE, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                memoryview(mm) as view:
+            data_off, data_len = find_data_chunk(mm)
+            for i in range(data_off, data_off + data_len, chunk_bytes):
+                # Zero-copy slice; the ASR stream copies it into its send buffer
+                with view[i:min(i + chunk_bytes, data_off + data_len)] as chunk:
+                    yield {"audio_content": chunk}
                 time.sleep(0.1)  # simulate real-time pacing
     except Exception as ex:
         print(f"[gen] Exception opening/reading WAV: {ex}")
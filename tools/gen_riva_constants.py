@@ -0,0 +1,34 @@
+"""
+Generate modules/riva_constants.py from the installed Riva client protos.
+
+Re-run whenever the Riva client version is bumped:
+    python tools/gen_riva_constants.py
+"""
+import os
+
+from riva.client.proto import riva_asr_pb2
+
+OUTPUT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules", "riva_constants.py")
+
+
+def _audio_encoding_enum():
+    # Same lookup order as asr_engine._resolve_encoding_value()
+    try:
+        return riva_asr_pb2.riva_dot_proto_dot_riva__audio__pb2.AudioEncoding
+    except AttributeError:
+        pass
+    if hasattr(riva_asr_pb2, "AudioEncoding"):
+        return riva_asr_pb2.AudioEncoding
+    return riva_asr_pb2.RecognitionConfig.AudioEncoding
+
+
+def main():
+    linear_pcm = _audio_encoding_enum().Value("LINEAR_PCM")
+    with open(OUTPUT_FILE, "w") as f:
+        f.write('"""Generated by tools/gen_riva_constants.py from the Riva client protos. Do not edit."""\n\n')
+        f.write(f"LINEAR_PCM = {int(linear_pcm)}\n")
+    print(f"Wrote {OUTPUT_FILE}: LINEAR_PCM = {linear_pcm}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 
-import socketserver
+import selectors
+import socket
 import threading
-import json
-import queue
+import collections
+import struct
 import traceback
 
+# orjson (Rust) when available; stdlib json otherwise. Only requests are
+# parsed here; ACKs are the preencoded _ACK_* frames below.
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    _loads = json.loads
+
 # Qt timer on VRED main thread (PySide6 in newer VRED; PySide2 in older)
 try:
     from PySide6.QtCore import QTimer  # VRED 2024+
@@ -26,16 +38,34 @@ USE_GROUP_IN_VSET_NAME = False
 # ==========================
 # Globals
 # ==========================
-_server = None
+_server = None         # listening socket
 _server_thread = None
+_stop_event = threading.Event()
 _dispatch_timer = None
-_command_queue = queue.Queue()
+_command_queue = collections.deque(maxlen=1024)  # append/popleft are atomic in CPython
 _last_activation = None  # last vset name (to de-duplicate rapid repeats)
 
+# Wire framing (both directions): 4-byte big-endian length, then a JSON payload
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+
+# Every ACK we send is constant, so encode (and frame) them once per process
+_ACK_OK = _frame(b'{"ok": true}')
+_ACK_PONG = _frame(b'{"ok": true, "pong": true}')
+_ACK_INVALID_JSON = _frame(b'{"ok": false, "error": "invalid_json"}')
+_ACK_UNAUTHORIZED = _frame(b'{"ok": false, "error": "unauthorized"}')
+_ACK_MISSING_VSET_NAME = _frame(b'{"ok": false, "error": "missing_vset_name"}')
+_ACK_MISSING_NAME = _frame(b'{"ok": false, "error": "missing_name"}')
+_ACK_UNKNOWN_ACTION = _frame(b'{"ok": false, "error": "unknown_action"}')
+
 
 def _enqueue_action(action: dict):
     """Put a validated action dict on the queue for main-thread execution."""
-    _command_queue.put(action)
+    _command_queue.append(action)
 
 
 def _derive_vset_name(group: str, name: str) -> str:
@@ -52,126 +82,199 @@ def _derive_vset_name(group: str, name: str) -> str:
 def _dispatch_actions():
     """Runs in the VRED main thread via QTimer. Executes queued actions safely."""
     global _last_activation
-    try:
-        while True:
-            action = _command_queue.get_nowait()
-            act = action.get("action")
-
-            if act == "activate_vset":
-                vset_name = (action.get("vset_name") or "").strip()
-                if not vset_name:
-                    print("[vred] Missing vset_name.")
-                    continue
-
-                # De-dupe rapid repeats
-                if _last_activation == vset_name:
-                    continue
-                _last_activation = vset_name
-
-                print(f"[vred] Activating Variant Set: '{vset_name}'")
-                try:
-                    selectVariantSet(vset_name)
-                except Exception as e:
-                    print(f"[vred] Error activating VSet '{vset_name}': {e}")
-
-            elif act == "activate_pair":
-                group = (action.get("group") or "").strip()
-                name = (action.get("name") or "").strip()
-                if not name:
-                    print("[vred] Missing 'name' in activate_pair.")
-                    continue
-
-                vset_name = _derive_vset_name(group, name)
-
-                # De-dupe rapid repeats
-                if _last_activation == vset_name:
-                    continue
-                _last_activation = vset_name
 
-                print(f"[vred] Pair → group='{group}', name='{name}' → VSet='{vset_name}'")
-                try:
-                    selectVariantSet(vset_name)
-                except Exception as e:
-                    print(f"[vred] Error activating VSet '{vset_name}': {e}")
-
-            elif act == "ping":
-                # NOP; ACK already returned on the socket thread
-                pass
+    # Drain everything queued this tick, then keep only the last request per
+    # VSet so a burst like [A, B, A] costs two selectVariantSet calls, not three.
+    drained = []
+    while True:
+        try:
+            drained.append(_command_queue.popleft())
+        except IndexError:
+            break
+
+    pending = collections.OrderedDict()  # vset_name -> log line
+    for action in drained:
+        act = action.get("action")
+
+        if act == "activate_vset":
+            vset_name = (action.get("vset_name") or "").strip()
+            if not vset_name:
+                print("[vred] Missing vset_name.")
+                continue
+            log = f"[vred] Activating Variant Set: '{vset_name}'"
+
+        elif act == "activate_pair":
+            group = (action.get("group") or "").strip()
+            name = (action.get("name") or "").strip()
+            if not name:
+                print("[vred] Missing 'name' in activate_pair.")
+                continue
+            vset_name = _derive_vset_name(group, name)
+            log = f"[vred] Pair → group='{group}', name='{name}' → VSet='{vset_name}'"
+
+        elif act == "ping":
+            # NOP; ACK already returned on the socket thread
+            continue
+
+        else:
+            print(f"[vred] Unknown action: {act}")
+            continue
+
+        pending[vset_name] = log
+        pending.move_to_end(vset_name)
+
+    for vset_name, log in pending.items():
+        # De-dupe rapid repeats
+        if _last_activation == vset_name:
+            continue
+        _last_activation = vset_name
+
+        print(log)
+        try:
+            selectVariantSet(vset_name)
+        except Exception as e:
+            print(f"[vred] Error activating VSet '{vset_name}': {e}")
 
-            else:
-                print(f"[vred] Unknown action: {act}")
 
-    except queue.Empty:
-        # nothing to do this tick
-        pass
+MAX_FRAME_BYTES = 64 * 1024  # drop clients announcing larger messages
 
 
-class VREDHandler(socketserver.StreamRequestHandler):
+class VREDHandler:
     """
-    Handles one TCP connection. We read NDJSON lines, validate, enqueue,
-    and send back a small JSON ACK.
+    One TCP connection, driven by the selector loop. We buffer length-prefixed
+    JSON frames, validate, enqueue, and send back a small framed JSON ACK.
     """
 
-    def handle(self):
-        peer = self.client_address
-        print(f"[vred] Connection from {peer}")
+    def __init__(self, sock: socket.socket, client_address):
+        self.sock = sock
+        self.client_address = client_address
+        self._inbuf = bytearray()
+        self._outbuf = bytearray()
+        self._events = selectors.EVENT_READ
+
+    def on_event(self, sel, mask):
+        if mask & selectors.EVENT_READ:
+            try:
+                data = self.sock.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                data = b""
+            if not data:
+                self.close(sel)
+                return
+            self._inbuf += data
+            while len(self._inbuf) >= _FRAME_HEADER.size:
+                (size,) = _FRAME_HEADER.unpack_from(self._inbuf)
+                if size > MAX_FRAME_BYTES:
+                    print(f"[vred] Frame too large ({size} bytes) from {self.client_address}; closing")
+                    self.close(sel)
+                    return
+                end = _FRAME_HEADER.size + size
+                if len(self._inbuf) < end:
+                    break
+                payload = bytes(self._inbuf[_FRAME_HEADER.size:end])
+                del self._inbuf[:end]
+                self.handle_message(payload)
+        self._flush(sel)
+
+    def handle_message(self, payload: bytes):
         try:
-            for raw_line in self.rfile:
-                try:
-                    line = raw_line.decode("utf-8").strip()
-                    if not line:
-                        continue
-                    msg = json.loads(line)
-                except Exception:
-                    self._send({"ok": False, "error": "invalid_json"})
-                    continue
-
-                # Optional simple auth
-                if SHARED_SECRET is not None:
-                    if msg.get("token") != SHARED_SECRET:
-                        self._send({"ok": False, "error": "unauthorized"})
-                        continue
-
-                action = msg.get("action")
-
-                if action == "activate_vset":
-                    vset_name = (msg.get("vset_name") or "").strip()
-                    if not vset_name:
-                        self._send({"ok": False, "error": "missing_vset_name"})
-                        continue
-                    _enqueue_action({"action": "activate_vset", "vset_name": vset_name})
-                    self._send({"ok": True})
-
-                elif action == "activate_pair":
-                    group = (msg.get("group") or "").strip()
-                    name = (msg.get("name") or "").strip()
-                    if not name:
-                        self._send({"ok": False, "error": "missing_name"})
-                        continue
-                    _enqueue_action({"action": "activate_pair", "group": group, "name": name})
-                    self._send({"ok": True})
-
-                elif action == "ping":
-                    self._send({"ok": True, "pong": True})
-
-                else:
-                    self._send({"ok": False, "error": "unknown_action"})
-
-        except Exception as e:
-            print(f"[vred] Handler error: {e}")
-            traceback.print_exc()
+            msg = _loads(payload)
+        except Exception:
+            self._send(_ACK_INVALID_JSON)
+            return
+
+        # Optional simple auth
+        if SHARED_SECRET is not None:
+            if msg.get("token") != SHARED_SECRET:
+                self._send(_ACK_UNAUTHORIZED)
+                return
+
+        action = msg.get("action")
+
+        if action == "activate_vset":
+            vset_name = (msg.get("vset_name") or "").strip()
+            if not vset_name:
+                self._send(_ACK_MISSING_VSET_NAME)
+                return
+            _enqueue_action({"action": "activate_vset", "vset_name": vset_name})
+            self._send(_ACK_OK)
+
+        elif action == "activate_pair":
+            group = (msg.get("group") or "").strip()
+            name = (msg.get("name") or "").strip()
+            if not name:
+                self._send(_ACK_MISSING_NAME)
+                return
+            _enqueue_action({"action": "activate_pair", "group": group, "name": name})
+            self._send(_ACK_OK)
+
+        elif action == "ping":
+            self._send(_ACK_PONG)
+
+        else:
+            self._send(_ACK_UNKNOWN_ACTION)
+
+    def _send(self, ack: bytes):
+        """Queue a preencoded _ACK_* frame for writing."""
+        self._outbuf += ack
+
+    def _flush(self, sel):
+        """Write as much pending ACK data as the socket takes; wait for EVENT_WRITE otherwise."""
+        if self._outbuf:
+            try:
+                sent = self.sock.send(self._outbuf)
+                del self._outbuf[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self.close(sel)
+                return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if self._outbuf else 0)
+        if events != self._events:
+            sel.modify(self.sock, events, self)
+            self._events = events
+
+    def close(self, sel):
+        try:
+            sel.unregister(self.sock)
+        except (KeyError, ValueError):
+            pass
+        self.sock.close()
+        print(f"[vred] Disconnected {self.client_address}")
 
-        print(f"[vred] Disconnected {peer}")
 
-    def _send(self, obj: dict):
-        data = (json.dumps(obj) + "\n").encode("utf-8")
-        self.wfile.write(data)
-        self.wfile.flush()
+def _accept(sel, server_sock: socket.socket):
+    try:
+        conn, peer = server_sock.accept()
+    except (BlockingIOError, InterruptedError):
+        return
+    conn.setblocking(False)
+    print(f"[vred] Connection from {peer}")
+    sel.register(conn, selectors.EVENT_READ, VREDHandler(conn, peer))
 
 
-class ThreadingTCPServer(socketserver.ThreadingTCPServer):
-    allow_reuse_address = True
-    daemon_threads = True  # kill handler threads with main program
+def _serve_forever(sel, server_sock: socket.socket):
+    """Single-threaded event loop: all client connections share this thread."""
+    try:
+        while not _stop_event.is_set():
+            for key, mask in sel.select(timeout=0.5):
+                if key.data is None:
+                    _accept(sel, server_sock)
+                    continue
+                try:
+                    key.data.on_event(sel, mask)
+                except Exception as e:
+                    print(f"[vred] Handler error: {e}")
+                    traceback.print_exc()
+                    key.data.close(sel)
+    finally:
+        for key in list(sel.get_map().values()):
+            if key.data is not None:
+                key.data.close(sel)
+        sel.close()
+        server_sock.close()
 
 
 def start_vred_listener(host: str = HOST, port: int = PORT):
@@ -181,9 +284,27 @@ def start_vred_listener(host: str = HOST, port: int = PORT):
     if _server is not None:
         print("[vred] Listener already running.")
         return
-    _server = ThreadingTCPServer((host, port), VREDHandler)
-    _server_thread = threading.Thread(target=_server.serve_forever, name="VREDListener", daemon=True)
-    _server_thread.start()
+    # Build everything locally; only publish _server once the loop is running,
+    # so a failed bind (e.g. port in use) leaves us free to retry
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sel = None
+    try:
+        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_sock.bind((host, port))
+        server_sock.listen()
+        server_sock.setblocking(False)
+
+        sel = selectors.DefaultSelector()
+        sel.register(server_sock, selectors.EVENT_READ, None)
+        _stop_event.clear()
+        thread = threading.Thread(target=_serve_forever, args=(sel, server_sock), name="VREDListener", daemon=True)
+        thread.start()
+    except Exception:
+        if sel is not None:
+            sel.close()
+        server_sock.close()
+        raise
+    _server, _server_thread = server_sock, thread
     print(f"[vred] Listening on {host}:{port}")
 
     # Start a QTimer to poll and dispatch actions on the VRED main thread
@@ -201,13 +322,11 @@ def stop_vred_listener():
         if _dispatch_timer is not None:
             _dispatch_timer.stop()
             _dispatch_timer = None
-        if _server is not None:
-            _server.shutdown()
-            _server.server_close()
-            _server = None
+        _stop_event.set()
         if _server_thread is not None:
             _server_thread.join(timeout=1.0)
             _server_thread = None
+        _server = None  # closed by the event loop on exit
         print("[vred] Listener stopped.")
     except Exception as e:
         print(f"[vred] Error stopping listener: {e}")